@@ -1,7 +1,13 @@
+from io import StringIO
 from logging.config import fileConfig
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
+from sqlalchemy import create_engine
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
 from alembic import context
+from alembic.runtime.migration import MigrationContext
+from alembic.util import CommandError
 import os
 import sys
 from dotenv import load_dotenv
@@ -16,6 +22,7 @@ load_dotenv()
 from app.core.database import Base
 from app.core.config import DB_URL
 import app.models  # This imports all models so Alembic can detect them
+from app.core.migrations import format_lock_report, lock_report
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -35,9 +42,29 @@ target_metadata = Base.metadata
 # my_important_option = config.get_main_option("my_important_option")
 # ... etc.
 
+# Fail fast on a busy table instead of waiting for a lock while every later query queues behind the migration
+# (the CONCURRENTLY / VALIDATE helpers in app/core/migrations.py lift it, their waits block no one)
+MIGRATION_LOCK_TIMEOUT = os.getenv("MIGRATION_LOCK_TIMEOUT", "5s")
+MIGRATION_STATEMENT_TIMEOUT = os.getenv("MIGRATION_STATEMENT_TIMEOUT", "0")
+
 def get_url():
     return DB_URL
 
+def get_current_revision():
+    """Read the revision(s) the database is at, so offline SQL starts from there instead of base."""
+    engine = create_engine(get_url(), poolclass=pool.NullPool)
+    try:
+        with engine.connect() as connection:
+            heads = MigrationContext.configure(connection).get_current_heads()
+    except SQLAlchemyError as e:
+        raise CommandError(
+            f"Could not read the current revision for the lock report ({e.__class__.__name__}); "
+            "pass it explicitly: alembic -x lock_report=true upgrade <current>:head --sql"
+        ) from e
+    finally:
+        engine.dispose()
+    return heads or "base"
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -49,18 +76,34 @@ def run_migrations_offline() -> None:
     Calls to context.execute() here emit the given string to the
     script output.
 
+    With ``-x lock_report=true`` the SQL is not printed; instead each
+    statement is listed with the table lock it would take. The report starts
+    from the revision the database is at (read from alembic_version) unless a
+    ``<start>:<end>`` range is given, so it only covers pending migrations.
+
     """
     url = get_url()
+    report = context.get_x_argument(as_dictionary=True).get("lock_report", "").lower() == "true"
+    buffer = StringIO() if report else None
+    starting_rev = None
+    if report and context.get_starting_revision_argument() is None:
+        starting_rev = get_current_revision()
     context.configure(
         url=url,
+        starting_rev=starting_rev,
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        transaction_per_migration=True,
+        output_buffer=buffer,
     )
 
     with context.begin_transaction():
         context.run_migrations()
 
+    if report:
+        print(format_lock_report(lock_report(buffer.getvalue())))
+
 
 def run_migrations_online() -> None:
     """Run migrations in 'online' mode.
@@ -78,8 +121,16 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
+        # Session level, so they also apply inside autocommit blocks
+        connection.execute(text(f"SET lock_timeout = '{MIGRATION_LOCK_TIMEOUT}'"))
+        connection.execute(text(f"SET statement_timeout = '{MIGRATION_STATEMENT_TIMEOUT}'"))
+        connection.commit()
+
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection,
+            target_metadata=target_metadata,
+            # Commit each revision on its own so locks are not held across the whole upgrade
+            transaction_per_migration=True,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,34 @@
+"""users email trigram index
+
+Revision ID: 3f1d7c2b9e41
+Revises: a9c4c0f8cb88
+Create Date: 2026-10-19 09:12:03.218114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.migrations import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1d7c2b9e41'
+down_revision = 'a9c4c0f8cb88'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    create_index_concurrently(
+        'ix_users_email_trgm',
+        'users',
+        ['email'],
+        unique=False,
+        postgresql_using='gin',
+        postgresql_ops={'email': 'gin_trgm_ops'},
+    )
+
+
+def downgrade() -> None:
+    drop_index_concurrently('ix_users_email_trgm', table_name='users')
@@ -1,45 +1,54 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Response
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
+from typing import List, Optional
 from uuid import UUID
 
 from app.core.auth import Auth
-from app.core.database import get_db
+from app.core.database import LazySession, get_db
+from app.core.tracing import traced
 from app.exceptions import AuthError
 from app.schemas.core.jwt_payload import JWTPayload
 from app.schemas.controller.login.login_response import LoginResponse
 from app.schemas.controller.login.refresh_response import RefreshResponse
 from app.schemas.controller.login.password_update_request import PasswordUpdateRequest
 from app.schemas.controller.login.password_update_response import PasswordUpdateResponse
-from app.services.login.login_service import LoginService
+from app.schemas.model.user.user_response import UserResponse
+from app.services.auth.auth import AuthService
 
 auth_router = APIRouter()
-auth_service = LoginService()
+auth_service = AuthService()
 
 @auth_router.post("/login", response_model=LoginResponse)
+@traced("controller")
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: LazySession = Depends(get_db)
 ):
     """Login user and return access and refresh tokens."""
     user = auth_service.authenticate_user(db, form_data.username, form_data.password)
     if not user:
+        db.release()
         raise AuthError("Incorrect email or password")
-    response = auth_service.create_tokens(db, user.id)
-    auth_service.update_last_connected(db, user)
+    response = auth_service.create_tokens(user)
+    auth_service.update_last_connected(db, user.id)
     return response
 
 
 @auth_router.post("/refresh", response_model=RefreshResponse)
+@traced("controller")
 async def refresh_access_token(
     user_data: JWTPayload = Depends(auth_service.auth.get_user_from_refresh_token),
-    db: Session = Depends(get_db)
+    db: LazySession = Depends(get_db)
 ):
     """Get a new access token using a refresh token."""
-    return auth_service.refresh_access_token(db, user_data.sub)
+    response = auth_service.refresh_access_token(db, UUID(user_data.sub))
+    db.release()
+    return response
 
 
 @auth_router.put("/password", response_model=PasswordUpdateResponse)
+@traced("controller")
 async def change_password(
     password_data: PasswordUpdateRequest,
     current_user: JWTPayload = Depends(Auth.get_current_user),
@@ -54,3 +63,24 @@ async def change_password(
     )
     return PasswordUpdateResponse(message="Password updated successfully", success=True)
 
+
+@auth_router.get("/admin/users", response_model=List[UserResponse])
+@traced("controller")
+async def list_users(
+    response: Response,
+    q: Optional[str] = Query(None, min_length=3, description="Email fragment to search for"),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    _: JWTPayload = Depends(Auth.get_superuser),
+    db: LazySession = Depends(get_db)
+):
+    """List users (superuser only), ranked by similarity when searching by email fragment.
+
+    Searching matches emails containing a word similar to the fragment, so small
+    typos still match.
+    """
+    users, next_cursor = auth_service.list_users(db, q, limit, cursor)
+    db.release()
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return users
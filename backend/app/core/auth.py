@@ -13,6 +13,7 @@ from passlib.context import CryptContext
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
+from app.core.database import get_db
 from app.exceptions.auth import AuthError
 from app.schemas.core.jwt_payload import JWTPayload
 
@@ -69,12 +70,12 @@ class Auth:
         try:
             payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
             if payload.get("type") != "access":
-                raise AuthenticationError("Invalid token type")
+                raise AuthError("Invalid token type")
             return JWTPayload(**payload)
         except ExpiredSignatureError:
-            raise AuthenticationError("Token expired")
+            raise AuthError("Token expired")
         except JWTError:
-            raise AuthenticationError("Could not validate credentials")
+            raise AuthError("Could not validate credentials")
 
     @staticmethod
     async def get_user_from_refresh_token(token: str = Depends(oauth2_refresh_scheme)) -> JWTPayload:
@@ -83,61 +84,52 @@ class Auth:
             payload = jwt.decode(token, REFRESH_SECRET_KEY, algorithms=[ALGORITHM])
             if payload.get("type") != "refresh":
                 print("Invalid token type detected")
-                raise AuthenticationError("Invalid refresh token type")
+                raise AuthError("Invalid refresh token type")
                 
             jwt_payload = JWTPayload(**payload)
             return jwt_payload
             
         except ExpiredSignatureError as e:
             print(f"Token expired: {str(e)}")
-            raise AuthenticationError("Refresh token expired")
+            raise AuthError("Refresh token expired")
         except JWTError as e:
             print(f"JWT Error: {str(e)}")
-            raise AuthenticationError("Could not validate refresh token")
+            raise AuthError("Could not validate refresh token")
         except Exception as e:
             print(f"Unexpected error: {str(e)}")
-            raise AuthenticationError("Authentication failed")
+            raise AuthError("Authentication failed")
 
     @staticmethod
     async def get_superuser(
-        token: str = Depends(oauth2_scheme)
+        token: str = Depends(oauth2_scheme),
+        db: Session = Depends(get_db)
     ) -> JWTPayload:
-        """Verify that the current user is a superuser.
-        Note: This requires database access, so it should be used with db: Session = Depends(get_db) in the endpoint.
-        """
+        """Verify that the current user is a superuser."""
         # Import here to avoid circular dependency
-        from app.core.database import get_db
-        from app.repositories.user.user_repository import UserRepository
-        
+        from app.repositories.user import UserRepo
+
         # First, validate the token and get JWT payload
         try:
             payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
             if payload.get("type") != "access":
-                raise AuthenticationError("Invalid token type")
+                raise AuthError("Invalid token type")
             jwt_payload = JWTPayload(**payload)
         except ExpiredSignatureError:
-            raise AuthenticationError("Token expired")
+            raise AuthError("Token expired")
         except JWTError:
-            raise AuthenticationError("Could not validate credentials")
-        
-        # Get database session and check superuser status
-        db = next(get_db())
-        try:
-            user_repo = UserRepository()
-            user = user_repo.get_by_id(db, UUID(jwt_payload.sub))
-            
-            if not user:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="User not found"
-                )
-            
-            if not user.is_superuser:
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="Not authorized. Superuser access required."
-                )
-            
-            return jwt_payload
-        finally:
-            db.close()
+            raise AuthError("Could not validate credentials")
+
+        user = UserRepo(db).get_row(id=UUID(jwt_payload.sub))
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+
+        if not user.is_superuser:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not authorized. Superuser access required."
+            )
+
+        return jwt_payload
@@ -1,16 +1,168 @@
-from sqlalchemy import create_engine
+import threading
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from app.core.config import DB_URL
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.sql.elements import TextClause
+from app.core.config import DB_URL, DB_REPLICA_URLS
+from app.core.metrics import metrics
+from app.core.routing import ReplicaSelector, mark_write, primary_pinned
+from app.core.tracing import instrument_engine
 
 engine = create_engine(DB_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+replica_engines = [create_engine(url, pool_pre_ping=True) for url in DB_REPLICA_URLS]
+replica_selector = ReplicaSelector(replica_engines)
+
+
+def _watch_replica(replica):
+    @event.listens_for(replica, "handle_error")
+    def _on_error(context):
+        # Connection failures and dropped connections take the replica out of rotation; a failed
+        # pre-ping is not one, the pool just reconnects (and a failed reconnect lands here again)
+        if context.is_pre_ping:
+            return
+        if context.is_disconnect or context.connection is None:
+            replica_selector.mark_failed(replica)
+
+
+for _replica in replica_engines:
+    _watch_replica(_replica)
+
+def _watch_pool(pool_engine, name: str):
+    """Track how many pooled connections are checked out, and the peak since startup."""
+    state = {"checked_out": 0, "peak": 0}
+    lock = threading.Lock()
+
+    @event.listens_for(pool_engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        with lock:
+            state["checked_out"] += 1
+            state["peak"] = max(state["peak"], state["checked_out"])
+            metrics.set("db_pool_checked_out", state["checked_out"], engine=name)
+            metrics.set("db_pool_checked_out_peak", state["peak"], engine=name)
+
+    @event.listens_for(pool_engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        with lock:
+            state["checked_out"] -= 1
+            metrics.set("db_pool_checked_out", state["checked_out"], engine=name)
+
+
+for _index, _engine in enumerate([engine, *replica_engines]):
+    instrument_engine(_engine)
+    _watch_pool(_engine, "primary" if _index == 0 else f"replica{_index - 1}")
+
+
+class RoutingSession(Session):
+    """Session sending writes to the primary and reads to a healthy replica.
+
+    Once a session has written, or the current request is pinned to the primary
+    (see PrimaryStickinessMiddleware), every statement goes to the primary.
+    Reads that a write will be based on opt in with execution_options(use_primary=True).
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or (clause is not None and _is_write(clause)):
+            self.info["wrote"] = True
+            mark_write()
+            return _route_primary("write")
+        if clause is not None and clause.get_execution_options().get("use_primary"):
+            return _route_primary("read_for_write")
+        if self.info.get("wrote"):
+            return _route_primary("session_wrote")
+        if primary_pinned():
+            return _route_primary("sticky")
+        if not replica_engines:
+            return _route_primary("no_replica")
+
+        # Keep a transaction on one replica so its reads see a consistent snapshot
+        replica = self.info.get("replica")
+        if replica is None:
+            replica = self._connect_replica()
+            if replica is None:
+                return _route_primary("replicas_down")
+            self.info["replica"] = replica
+        metrics.inc("db_route_total", target="replica", replica=replica_selector.index_of(replica))
+        return replica
+
+    def _connect_replica(self):
+        """Connect to a healthy replica now, so one that is down is skipped instead of failing the request."""
+        for _ in range(len(replica_engines)):
+            replica = replica_selector.pick()
+            if replica is None:
+                return None
+            try:
+                self.connection(bind_arguments={"bind": replica})
+            except DBAPIError:
+                continue  # handle_error took it out of rotation
+            return replica
+        return None
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _forget_replica(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("replica", None)
+
+
+def _is_write(clause) -> bool:
+    if isinstance(clause, TextClause):
+        return not clause.text.lstrip().upper().startswith(("SELECT", "WITH"))
+    return getattr(clause, "is_dml", False) or getattr(clause, "_for_update_arg", None) is not None
+
+
+def _route_primary(reason: str):
+    metrics.inc("db_route_total", target="primary", reason=reason)
+    return engine
+
+
+# Objects stay usable after commit, so a commit hands the connection back to the pool for good
+SessionLocal = sessionmaker(
+    class_=RoutingSession, autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
+)
 
 Base = declarative_base()
 
+class LazySession:
+    """Proxy that only builds the real Session the first time it is used.
+
+    The underlying Session checks a connection out on its first statement and
+    returns it on commit, so handlers that never query the database never touch
+    the pool, and handlers that commit (or release() after reading) free their
+    connection before the response is serialized.
+    """
+
+    def __init__(self, factory=SessionLocal):
+        self._factory = factory
+        self._session = None
+
+    def __getattr__(self, name):
+        if self._session is None:
+            self._session = self._factory()
+            metrics.inc("db_sessions_total", used="true")
+        return getattr(self._session, name)
+
+    def release(self) -> None:
+        """End a read-only transaction so its connection is back in the pool before the response is sent.
+
+        Dependency teardown only runs once the response went out; handlers that
+        only read call this when they are done with the database. Rows stay
+        usable, ORM instances loaded so far are expired.
+        """
+        if self._session is not None:
+            self._session.rollback()
+
+    def close(self) -> None:
+        if self._session is None:
+            metrics.inc("db_sessions_total", used="false")
+            return
+        self._session.close()
+
+
 def get_db():
-    """Dependency to get database session"""
-    db = SessionLocal()
+    """Dependency to get a lazily opened database session"""
+    db = LazySession()
     try:
         yield db
     finally:
@@ -3,6 +3,8 @@ import logging
 import json
 from typing import Optional, Any, Dict
 
+from app.core.tracing import current_span
+
 logger = logging.getLogger("your_project")
 
 class JSONFormatter(logging.Formatter):
@@ -16,6 +18,12 @@ class JSONFormatter(logging.Formatter):
             "message": record.getMessage(),
         }
         
+        # Correlate with the active trace
+        span = current_span()
+        if span is not None:
+            log_data["trace_id"] = span.trace_id
+            log_data["span_id"] = span.span_id
+
         # Add extra fields if present
         if hasattr(record, "extra_data"):
             log_data.update(record.extra_data)
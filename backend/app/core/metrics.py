@@ -0,0 +1,38 @@
+import threading
+from collections import defaultdict
+from typing import Any, Dict
+
+
+def _key(name: str, labels: Dict[str, Any]) -> str:
+    if not labels:
+        return name
+    rendered = ",".join(f"{k}={labels[k]}" for k in sorted(labels))
+    return f"{name}{{{rendered}}}"
+
+
+class Metrics:
+    """Minimal in-process counters and gauges, safe to use from worker threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = defaultdict(int)
+        self._gauges: Dict[str, float] = {}
+
+    def inc(self, name: str, amount: int = 1, **labels) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] += amount
+
+    def set(self, name: str, value: float, **labels) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {"counters": dict(self._counters), "gauges": dict(self._gauges)}
+
+
+metrics = Metrics()
+
+__all__ = ["metrics", "Metrics"]
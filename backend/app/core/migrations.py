@@ -0,0 +1,247 @@
+"""Helpers for migrations that must not block large tables.
+
+Use them from Alembic revision scripts:
+
+    from app.core.migrations import create_index_concurrently
+
+    def upgrade() -> None:
+        create_index_concurrently("ix_users_created_at", "users", ["created_at"])
+
+Preview the locks a pending upgrade would take, without executing anything:
+
+    alembic -x lock_report=true upgrade head --sql
+
+The report starts from the revision recorded in the database's alembic_version
+table (only read). Where the database is not reachable, give the range
+explicitly: ``upgrade <current>:head --sql``.
+"""
+import re
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence
+
+import sqlalchemy as sa
+from alembic import context, op
+
+PROGRESS_TABLE = "alembic_backfill_progress"
+
+
+@contextmanager
+def _no_lock_timeout():
+    """Lift MIGRATION_LOCK_TIMEOUT for the enclosed statements, restoring it afterwards.
+
+    CONCURRENTLY and VALIDATE wait for older transactions on the table to finish;
+    that wait is a lock wait too, but it blocks no one else, and cutting it short
+    fails the migration (leaving an INVALID index behind for index builds).
+    """
+    if context.is_offline_mode():
+        op.execute("SET lock_timeout = 0")
+        yield
+        op.execute("RESET lock_timeout")
+        return
+    bind = op.get_bind()
+    previous = bind.execute(sa.text("SHOW lock_timeout")).scalar()
+    bind.execute(sa.text("SET lock_timeout = 0"))
+    try:
+        yield
+    finally:
+        bind.execute(sa.text("SELECT set_config('lock_timeout', :value, false)"), {"value": previous})
+
+
+def create_index_concurrently(index_name: str, table_name: str, columns: Sequence[str], **kw) -> None:
+    """CREATE INDEX CONCURRENTLY outside the migration transaction, without a lock timeout.
+
+    A previous interrupted build leaves an INVALID index behind; it is dropped
+    and rebuilt instead of being silently kept by IF NOT EXISTS.
+    """
+    with op.get_context().autocommit_block(), _no_lock_timeout():
+        if not context.is_offline_mode() and _index_is_invalid(index_name):
+            op.drop_index(index_name, table_name=table_name, postgresql_concurrently=True)
+        op.create_index(index_name, table_name, columns, postgresql_concurrently=True, if_not_exists=True, **kw)
+
+
+def drop_index_concurrently(index_name: str, table_name: str) -> None:
+    """DROP INDEX CONCURRENTLY outside the migration transaction, without a lock timeout."""
+    with op.get_context().autocommit_block(), _no_lock_timeout():
+        op.drop_index(index_name, table_name=table_name, postgresql_concurrently=True, if_exists=True)
+
+
+def add_check_constraint_not_valid(constraint_name: str, table_name: str, condition: str) -> None:
+    """Add a CHECK constraint enforced for new rows only; existing rows are checked by validate_constraint."""
+    op.execute(f'ALTER TABLE "{table_name}" ADD CONSTRAINT "{constraint_name}" CHECK ({condition}) NOT VALID')
+
+
+def add_foreign_key_not_valid(
+    constraint_name: str,
+    source_table: str,
+    referent_table: str,
+    local_cols: Sequence[str],
+    remote_cols: Sequence[str],
+    ondelete: Optional[str] = None,
+) -> None:
+    """Add a FOREIGN KEY enforced for new rows only; existing rows are checked by validate_constraint."""
+    local = ", ".join(f'"{c}"' for c in local_cols)
+    remote = ", ".join(f'"{c}"' for c in remote_cols)
+    on_delete = f" ON DELETE {ondelete}" if ondelete else ""
+    op.execute(
+        f'ALTER TABLE "{source_table}" ADD CONSTRAINT "{constraint_name}" '
+        f'FOREIGN KEY ({local}) REFERENCES "{referent_table}" ({remote}){on_delete} NOT VALID'
+    )
+
+
+def validate_constraint(constraint_name: str, table_name: str) -> None:
+    """Validate a NOT VALID constraint in its own transaction.
+
+    VALIDATE only takes SHARE UPDATE EXCLUSIVE, so reads and writes continue
+    during the scan, as long as the ACCESS EXCLUSIVE lock from ADD CONSTRAINT
+    was already committed. Waiting for that lock blocks no one, so it is not
+    subject to MIGRATION_LOCK_TIMEOUT.
+    """
+    with op.get_context().autocommit_block(), _no_lock_timeout():
+        op.execute(f'ALTER TABLE "{table_name}" VALIDATE CONSTRAINT "{constraint_name}"')
+
+
+def backfill_in_batches(
+    name: str,
+    table_name: str,
+    set_clause: str,
+    where: str = "TRUE",
+    key: str = "id",
+    batch_size: int = 1000,
+    pause_seconds: float = 0.1,
+) -> None:
+    """Run UPDATE table SET set_clause WHERE where, one committed batch at a time.
+
+    Batches walk the table in key order and each one commits, so row locks are
+    short-lived and replicas keep up. Progress is stored under ``name`` in
+    alembic_backfill_progress; rerunning the migration after an interruption
+    resumes after the last committed key. The progress row is deleted once no
+    rows are left, so a later run under the same name (e.g. after a downgrade)
+    starts from the beginning again.
+    """
+    statement = (
+        f'UPDATE "{table_name}" SET {set_clause} WHERE "{key}" IN ('
+        f'SELECT "{key}" FROM "{table_name}" WHERE ({where}) <after>'
+        f'ORDER BY "{key}" LIMIT {int(batch_size)}) RETURNING "{key}"'
+    )
+
+    if context.is_offline_mode():
+        # Nothing to loop over when rendering SQL; emit the shape of one batch
+        with op.get_context().autocommit_block():
+            op.execute(f"-- backfill {name}: repeated in batches of {batch_size} until no rows match")
+            op.execute(statement.replace("<after>", ""))
+        return
+
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        bind.execute(sa.text(
+            f"CREATE TABLE IF NOT EXISTS {PROGRESS_TABLE} ("
+            "name VARCHAR PRIMARY KEY, last_key VARCHAR, rows_done BIGINT NOT NULL DEFAULT 0, "
+            "updated_at TIMESTAMPTZ NOT NULL DEFAULT now())"
+        ))
+        progress = bind.execute(
+            sa.text(f"SELECT last_key, rows_done FROM {PROGRESS_TABLE} WHERE name = :name"), {"name": name}
+        ).first()
+        last_key, rows_done = (progress.last_key, progress.rows_done) if progress else (None, 0)
+
+        while True:
+            after = f'AND "{key}" > :last_key ' if last_key is not None else ""
+            keys = [row[0] for row in bind.execute(sa.text(statement.replace("<after>", after)), {"last_key": last_key})]
+            if not keys:
+                break
+            last_key, rows_done = str(max(keys)), rows_done + len(keys)
+            bind.execute(
+                sa.text(
+                    f"INSERT INTO {PROGRESS_TABLE} (name, last_key, rows_done, updated_at) "
+                    "VALUES (:name, :last_key, :rows_done, now()) "
+                    "ON CONFLICT (name) DO UPDATE SET last_key = EXCLUDED.last_key, "
+                    "rows_done = EXCLUDED.rows_done, updated_at = EXCLUDED.updated_at"
+                ),
+                {"name": name, "last_key": last_key, "rows_done": rows_done},
+            )
+            time.sleep(pause_seconds)
+
+        bind.execute(sa.text(f"DELETE FROM {PROGRESS_TABLE} WHERE name = :name"), {"name": name})
+
+
+def _index_is_invalid(index_name: str) -> bool:
+    return bool(op.get_bind().execute(
+        sa.text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ),
+        {"name": index_name},
+    ).first())
+
+
+# (pattern, lock taken, impact) - first match wins, so specific patterns come first
+_LOCK_RULES = [
+    (r"^CREATE (UNIQUE )?INDEX CONCURRENTLY", "SHARE UPDATE EXCLUSIVE", "reads and writes continue"),
+    (r"^CREATE (UNIQUE )?INDEX", "SHARE", "blocks writes for the whole index build"),
+    (r"^DROP INDEX CONCURRENTLY", "SHARE UPDATE EXCLUSIVE", "reads and writes continue"),
+    (r"^DROP INDEX", "ACCESS EXCLUSIVE", "blocks reads and writes (brief)"),
+    (r"^ALTER TABLE .* VALIDATE CONSTRAINT", "SHARE UPDATE EXCLUSIVE", "reads and writes continue during the scan"),
+    (r"^ALTER TABLE .* ADD CONSTRAINT .* FOREIGN KEY .* NOT VALID", "SHARE ROW EXCLUSIVE", "blocks writes (brief, no scan)"),
+    (r"^ALTER TABLE .* NOT VALID", "ACCESS EXCLUSIVE", "blocks reads and writes (brief, no scan)"),
+    (r"^ALTER TABLE .* ADD CONSTRAINT .* FOREIGN KEY", "SHARE ROW EXCLUSIVE", "blocks writes while every row is checked"),
+    (r"^ALTER TABLE .* ADD CONSTRAINT", "ACCESS EXCLUSIVE", "blocks reads and writes while every row is checked"),
+    (r"^ALTER TABLE .* ALTER COLUMN .* TYPE", "ACCESS EXCLUSIVE", "blocks reads and writes, may rewrite the table"),
+    (r"^ALTER TABLE .* SET NOT NULL", "ACCESS EXCLUSIVE", "blocks reads and writes while every row is checked"),
+    (r"^ALTER TABLE", "ACCESS EXCLUSIVE", "blocks reads and writes (brief unless the table is rewritten)"),
+    (r"^DROP TABLE", "ACCESS EXCLUSIVE", "blocks reads and writes"),
+    (r"^(UPDATE|DELETE)", "ROW EXCLUSIVE", "locks every matched row until commit"),
+    (r"^INSERT", "ROW EXCLUSIVE", "no conflict with readers"),
+    (r"^CREATE TABLE", "-", "new table, nothing blocked"),
+]
+
+_TABLE = re.compile(r'\b(?:TABLE|ON|UPDATE|INTO|FROM)\s+(?:ONLY\s+)?(?:IF (?:NOT )?EXISTS\s+)?"?([\w.]+)"?', re.I)
+
+
+def lock_report(sql: str) -> List[Dict[str, str]]:
+    """Classify the statements of an offline (--sql) migration by the table locks they take.
+
+    Each entry notes whether the statement runs inside a transaction, since any
+    lock it takes is then held until that transaction commits.
+    """
+    report = []
+    in_transaction = False
+    for raw in sql.split(";"):
+        statement = " ".join(
+            " ".join(line for line in raw.splitlines() if not line.strip().startswith("--")).split()
+        )
+        if not statement:
+            continue
+        upper = statement.upper()
+        if upper in ("BEGIN", "START TRANSACTION"):
+            in_transaction = True
+            continue
+        if upper in ("COMMIT", "ROLLBACK"):
+            in_transaction = False
+            continue
+        if upper.startswith(("SET ", "RESET ")):
+            continue
+        if "ALEMBIC_VERSION" in upper:
+            continue
+        lock, impact = next(
+            ((lock, impact) for pattern, lock, impact in _LOCK_RULES if re.search(pattern, upper, re.S)),
+            ("-", "no table lock of note"),
+        )
+        table = _TABLE.search(statement)
+        report.append({
+            "statement": statement if len(statement) <= 100 else statement[:97] + "...",
+            "table": table.group(1) if table else "-",
+            "lock": lock,
+            "impact": impact,
+            "transaction": "held until COMMIT" if in_transaction else "autocommit",
+        })
+    return report
+
+
+def format_lock_report(report: List[Dict[str, str]]) -> str:
+    lines = ["Lock impact report (dry run, nothing was executed)", ""]
+    for entry in report:
+        lines.append(f"[{entry['lock']}] {entry['table']} - {entry['impact']} ({entry['transaction']})")
+        lines.append(f"    {entry['statement']}")
+    if not report:
+        lines.append("No statements to run between the starting revision and the target.")
+    return "\n".join(lines)
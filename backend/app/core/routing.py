@@ -0,0 +1,125 @@
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import List, Optional
+
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+from app.core.config import DB_PRIMARY_STICKY_SECONDS, DB_REPLICA_RETRY_SECONDS
+from app.core.logging import logger
+from app.core.metrics import metrics
+
+# Cookie / header carrying the epoch second until which a client reads from the primary
+STICKY_COOKIE = "db_primary_until"
+STICKY_HEADER = "x-db-primary-until"
+
+
+class ReplicaSelector:
+    """Round-robin over replica engines, skipping the ones that recently failed"""
+
+    def __init__(self, engines: List[Engine], retry_seconds: int = DB_REPLICA_RETRY_SECONDS):
+        self.engines = engines
+        self.retry_seconds = retry_seconds
+        self._down_until = [0.0] * len(engines)
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def pick(self) -> Optional[Engine]:
+        """Return the next healthy replica, or None if every replica is out of rotation."""
+        now = time.monotonic()
+        with self._lock:
+            for _ in range(len(self.engines)):
+                index = self._next
+                self._next = (self._next + 1) % len(self.engines)
+                if self._down_until[index] <= now:
+                    return self.engines[index]
+        return None
+
+    def mark_failed(self, engine: Engine) -> None:
+        with self._lock:
+            index = self.engines.index(engine)
+            self._down_until[index] = time.monotonic() + self.retry_seconds
+        metrics.inc("db_replica_failures_total", replica=index)
+        logger.warning("Replica %s taken out of rotation for %ss", index, self.retry_seconds)
+
+    def index_of(self, engine: Engine) -> int:
+        return self.engines.index(engine)
+
+
+@dataclass
+class RoutingState:
+    """Per-request routing state shared between the middleware and the sessions it spawns"""
+    pinned: bool = False
+    wrote: bool = False
+
+
+_routing_state: ContextVar[Optional[RoutingState]] = ContextVar("db_routing_state", default=None)
+
+
+def primary_pinned() -> bool:
+    state = _routing_state.get()
+    return state is not None and (state.pinned or state.wrote)
+
+
+def mark_write() -> None:
+    state = _routing_state.get()
+    if state is not None:
+        state.wrote = True
+
+
+def _sticky_until(headers) -> float:
+    """Read the sticky deadline from the request header or cookie, 0 if absent or malformed."""
+    for name, value in headers:
+        name = name.decode("latin-1").lower()
+        value = value.decode("latin-1")
+        if name == STICKY_HEADER:
+            candidate = value
+        elif name == "cookie":
+            candidate = next(
+                (part.split("=", 1)[1] for part in value.split(";") if part.strip().startswith(f"{STICKY_COOKIE}=")),
+                None,
+            )
+        else:
+            continue
+        try:
+            return float(candidate)
+        except (TypeError, ValueError):
+            continue
+    return 0.0
+
+
+class PrimaryStickinessMiddleware:
+    """Pin clients to the primary for a short window after they wrote, so they read their own updates"""
+
+    def __init__(self, app, sticky_seconds: int = DB_PRIMARY_STICKY_SECONDS):
+        self.app = app
+        self.sticky_seconds = sticky_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        now = time.time()
+        # The deadline comes from the client: one later than a fresh sticky window was not issued here
+        until = _sticky_until(scope["headers"])
+        state = RoutingState(pinned=now < until <= now + self.sticky_seconds)
+        token = _routing_state.set(state)
+
+        async def send_with_sticky(message):
+            if message["type"] == "http.response.start" and state.wrote:
+                until = int(time.time()) + self.sticky_seconds
+                headers = MutableHeaders(scope=message)
+                headers.append(STICKY_HEADER, str(until))
+                headers.append(
+                    "set-cookie",
+                    f"{STICKY_COOKIE}={until}; Max-Age={self.sticky_seconds}; Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_sticky)
+        finally:
+            _routing_state.reset(token)
@@ -0,0 +1,251 @@
+import functools
+import inspect
+import json
+import logging
+import queue
+import random
+import re
+import threading
+import time
+from contextvars import ContextVar, Token
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import TRACE_EXPORT_PATH, TRACE_SAMPLE_RATIO
+
+_log = logging.getLogger(__name__)
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class Span:
+    """A timed operation within a trace"""
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "sampled",
+                 "attributes", "start_ns", "end_ns", "error", "_token")
+
+    def __init__(self, trace_id: str, span_id: str, parent_id: Optional[str], name: str,
+                 kind: str, sampled: bool, attributes: Optional[Dict[str, Any]] = None):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.sampled = sampled
+        self.attributes = attributes or {}
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+        self._token: Optional[Token] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """Render the span like an OTLP/JSON span record."""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "attributes": [{"key": k, "value": {"stringValue": str(v)}} for k, v in self.attributes.items()],
+            "status": {"code": "ERROR", "message": self.error} if self.error else {"code": "OK"},
+        }
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Span]:
+    """Turn a W3C traceparent header into a remote parent span, None if absent or invalid."""
+    match = _TRACEPARENT.match((header or "").strip().lower())
+    if not match:
+        return None
+    trace_id, span_id, flags = match.groups()
+    if trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    return Span(trace_id, span_id, None, "remote", "remote", sampled=bool(int(flags, 16) & 1))
+
+
+class FileSpanExporter:
+    """Append sampled spans as JSON lines from a background thread, standing in for an OTLP collector"""
+
+    def __init__(self, path: str, max_queue: int = 10000):
+        self.path = path
+        self._queue: "queue.Queue[Span]" = queue.Queue(maxsize=max_queue)
+        threading.Thread(target=self._run, name="span-exporter", daemon=True).start()
+
+    def export(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            pass  # Drop spans rather than slow requests down
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while not self._queue.empty() and len(batch) < 512:
+                batch.append(self._queue.get_nowait())
+            try:
+                with open(self.path, "a") as f:
+                    f.writelines(json.dumps(span.to_otlp()) + "\n" for span in batch)
+            except OSError as e:
+                _log.warning(f"Could not export {len(batch)} spans: {e}")
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+class Tracer:
+    """Creates spans, applies head-based sampling and hands finished spans to the exporter"""
+
+    def __init__(self, exporter: Optional[FileSpanExporter], sample_ratio: float):
+        self.exporter = exporter
+        self.sample_ratio = sample_ratio
+
+    def start_span(self, name: str, kind: str = "internal", parent: Optional[Span] = None,
+                   attributes: Optional[Dict[str, Any]] = None) -> Span:
+        """Start a span and make it current; it must be closed with end_span in the same context."""
+        parent = parent or _current_span.get()
+        if parent is None:
+            # Head-based sampling: decided once at the root, inherited by every child
+            trace_id = f"{random.getrandbits(128):032x}"
+            sampled = random.random() < self.sample_ratio
+        else:
+            trace_id, sampled = parent.trace_id, parent.sampled
+        span = Span(trace_id, f"{random.getrandbits(64):016x}", parent.span_id if parent else None,
+                    name, kind, sampled, attributes)
+        span._token = _current_span.set(span)
+        return span
+
+    def end_span(self, span: Span, error: Optional[BaseException] = None) -> None:
+        span.end_ns = time.time_ns()
+        if error is not None:
+            span.error = type(error).__name__
+        if span._token is not None:
+            _current_span.reset(span._token)
+            span._token = None
+        if span.sampled and self.exporter is not None:
+            self.exporter.export(span)
+
+
+tracer = Tracer(FileSpanExporter(TRACE_EXPORT_PATH) if TRACE_EXPORT_PATH else None, TRACE_SAMPLE_RATIO)
+
+
+def traced(layer: str, name: Optional[str] = None):
+    """Decorator wrapping a function or coroutine in a span tagged with its layer."""
+
+    def decorator(func):
+        span_name = name or func.__qualname__
+        attributes = {"code.layer": layer}
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                span = tracer.start_span(span_name, attributes=dict(attributes))
+                try:
+                    result = await func(*args, **kwargs)
+                except BaseException as e:
+                    tracer.end_span(span, e)
+                    raise
+                tracer.end_span(span)
+                return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            span = tracer.start_span(span_name, attributes=dict(attributes))
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as e:
+                tracer.end_span(span, e)
+                raise
+            tracer.end_span(span)
+            return result
+        return wrapper
+
+    return decorator
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Emit a client span around every SQL statement executed through the engine."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if context is None:
+            return
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "UNKNOWN"
+        context._trace_span = tracer.start_span(
+            f"db.{operation.lower()}",
+            kind="client",
+            attributes={"db.system": conn.dialect.name, "db.operation": operation},
+        )
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        span = getattr(context, "_trace_span", None)
+        if span is not None:
+            tracer.end_span(span)
+            context._trace_span = None
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        context = exception_context.execution_context
+        span = getattr(context, "_trace_span", None) if context is not None else None
+        if span is not None:
+            tracer.end_span(span, exception_context.original_exception)
+            context._trace_span = None
+
+
+def _route_name(scope) -> Optional[str]:
+    """Template of the matched route (e.g. /api/auth/admin/users/{user_id}), None when nothing matched."""
+    route = scope.get("route")
+    return getattr(route, "path", None)
+
+
+class TracingMiddleware:
+    """Open a server span per request, continuing the caller's W3C traceparent if any"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+        method = scope["method"]
+        span = tracer.start_span(f"HTTP {method}", kind="server",
+                                 parent=parse_traceparent(headers.get("traceparent")),
+                                 attributes={"http.method": method})
+
+        async def send_with_traceparent(message):
+            if message["type"] == "http.response.start":
+                span.set_attribute("http.status_code", message["status"])
+                message.setdefault("headers", [])
+                message["headers"] = [*message["headers"], (b"traceparent", span.traceparent.encode())]
+            await send(message)
+
+        error = None
+        try:
+            await self.app(scope, receive, send_with_traceparent)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            route = _route_name(scope)
+            if route:
+                span.name = f"{method} {route}"
+                span.set_attribute("http.route", route)
+            tracer.end_span(span, error)
+
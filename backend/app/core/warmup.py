@@ -0,0 +1,78 @@
+import asyncio
+from typing import Iterable, get_args
+
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.core.auth import Auth
+from app.core.logging import logger
+
+
+def warm_pool(engine: Engine, connections: int) -> None:
+    """Open connections up front so they are waiting in the pool for the first requests."""
+    # Opening more than pool_size would only create overflow connections that get discarded
+    size = getattr(engine.pool, "size", lambda: connections)()
+    opened = []
+    try:
+        # One at a time, so a failing connect still closes the ones already open
+        for _ in range(min(connections, size)):
+            opened.append(engine.connect())
+            opened[-1].execute(text("SELECT 1"))
+    finally:
+        for conn in opened:
+            conn.close()
+
+
+def warm_hashing() -> None:
+    """Run one hash/verify so passlib loads and probes its bcrypt backend now."""
+    auth = Auth()
+    hashed = auth.get_password_hash("warmup-password")
+    auth.verify_password("warmup-password", hashed)
+
+
+def warm_schemas(app: FastAPI) -> None:
+    """Build the OpenAPI document and the JSON schemas of every response model."""
+    app.openapi()
+    for route in app.routes:
+        if not isinstance(route, APIRoute) or route.response_model is None:
+            continue
+        # Unwrap containers such as List[UserResponse]
+        for model in (route.response_model, *get_args(route.response_model)):
+            if isinstance(model, type) and issubclass(model, BaseModel):
+                model.model_json_schema()
+
+
+async def run_warmup(app: FastAPI, primary: Engine, replicas: Iterable[Engine], connections: int) -> None:
+    """Warm the worker, retrying until the primary answers, then flag it as ready.
+
+    Only the primary pool, hashing and schemas gate readiness; steps that already
+    succeeded are not repeated on retry. Replicas are warmed best-effort, since a
+    down replica is skipped by the router and must not keep the worker unready.
+    """
+    steps = [
+        ("primary pool", warm_pool, (primary, connections)),
+        ("hashing", warm_hashing, ()),
+        ("schemas", warm_schemas, (app,)),
+    ]
+    attempt = 0
+    while steps:
+        name, step, args = steps[0]
+        try:
+            await asyncio.to_thread(step, *args)
+            steps.pop(0)
+        except Exception as e:
+            attempt += 1
+            delay = min(2 ** attempt, 30)
+            logger.error(f"Warmup of {name} failed (attempt {attempt}), retrying in {delay}s: {e}")
+            await asyncio.sleep(delay)
+    app.state.ready = True
+    logger.info("Warmup complete, worker is ready")
+
+    for index, replica in enumerate(replicas):
+        try:
+            await asyncio.to_thread(warm_pool, replica, connections)
+        except Exception as e:
+            logger.warning(f"Warmup of replica {index} failed, continuing without it: {e}")
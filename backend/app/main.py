@@ -1,17 +1,40 @@
-from fastapi import FastAPI
+import asyncio
+import secrets
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import FastAPI, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 import json
 
+from app.core.config import METRICS_TOKEN, WARMUP_DB_CONNECTIONS
+from app.core.database import engine, replica_engines
+from app.core.warmup import run_warmup
+
 # Import logging
 from app.core.logging import logger
+from app.core.metrics import metrics
+from app.core.routing import PrimaryStickinessMiddleware
+from app.core.tracing import TracingMiddleware
 
 # Import routers
 from app.routes.public import public_router
 from app.routes.private import private_router
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background so liveness answers while /ready reports 503
+    app.state.ready = False
+    warmup = asyncio.create_task(run_warmup(app, engine, replica_engines, WARMUP_DB_CONNECTIONS))
+    yield
+    warmup.cancel()
+
+
 app = FastAPI(
     title="backend",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 
@@ -22,8 +45,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-DB-Primary-Until", "X-Next-Cursor", "traceparent"],
 )
 
+# Pin clients to the primary database right after they write
+app.add_middleware(PrimaryStickinessMiddleware)
+
+# Outermost, so the request span covers everything else
+app.add_middleware(TracingMiddleware)
+
 # Include routers
 app.include_router(public_router)
 app.include_router(private_router)
@@ -34,6 +64,23 @@ async def root():
     return {"status": "ok", "service": "backend-api", "version": "1.0.0"}
 
 
+@app.get("/ready", include_in_schema=False)
+async def ready():
+    if not getattr(app.state, "ready", False):
+        return JSONResponse(status_code=503, content={"status": "warming_up"})
+    return {"status": "ready"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics(authorization: Optional[str] = Header(None)):
+    # Pool and replica internals are for the scraper only, never the public
+    if not METRICS_TOKEN:
+        return JSONResponse(status_code=404, content={"detail": "Not Found"})
+    if not secrets.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+        return JSONResponse(status_code=401, content={"detail": "Not authenticated"})
+    return metrics.snapshot()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8080)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean
+from sqlalchemy import Column, String, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy import DateTime
 
@@ -7,9 +7,17 @@ from app.models.base import BaseModel
 class User(BaseModel):
     """User model for storing user information"""
     __tablename__ = "users"
+    __table_args__ = (
+        # Trigram index backing substring search on email (requires pg_trgm)
+        Index(
+            "ix_users_email_trgm",
+            "email",
+            postgresql_using="gin",
+            postgresql_ops={"email": "gin_trgm_ops"},
+        ),
+    )
 
     email = Column(String, unique=True, index=True, nullable=False)
     password = Column(String, nullable=False)
     is_superuser = Column(Boolean, default=False)
     last_connected_at = Column(DateTime(timezone=True), nullable=True)
-
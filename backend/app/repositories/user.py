@@ -1,19 +1,114 @@
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import Float, and_, bindparam, cast, func, literal, or_, select, update
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
 from uuid import UUID
+from app.core.tracing import traced
 from app.models.user import User
 from app.exceptions.database import NotFoundError, ConflictError
 
+users = User.__table__
+
+
 class UserRepo:
+    # Statements are built once per set of filter columns and reused, so SQLAlchemy
+    # hits its compiled cache without regenerating the query on every call.
+    _entity_statements: Dict[Tuple[str, ...], Select] = {}
+    _row_statements: Dict[Tuple[Tuple[str, ...], bool], Select] = {}
 
     def __init__(self, db: Session):
         self.db = db
 
-    def get(self, **kwargs):
-        query = self.db.query(User)
-        for attr, value in kwargs.items():
-            query = query.filter(getattr(User, attr) == value)
-        return query.first()
+    @staticmethod
+    def _columns(kwargs) -> Tuple[str, ...]:
+        columns = tuple(sorted(kwargs))
+        for column in columns:
+            if column not in users.c:
+                raise AttributeError(f"User has no column '{column}'")
+        return columns
+
+    @classmethod
+    def _entity_statement(cls, columns: Tuple[str, ...]) -> Select:
+        stmt = cls._entity_statements.get(columns)
+        if stmt is None:
+            # Entities are loaded to be modified, so read them where the write will go
+            stmt = (
+                select(User)
+                .where(*(users.c[c] == bindparam(c) for c in columns))
+                .limit(1)
+                .execution_options(use_primary=True)
+            )
+            cls._entity_statements[columns] = stmt
+        return stmt
+
+    @classmethod
+    def _row_statement(cls, columns: Tuple[str, ...], use_primary: bool = False) -> Select:
+        stmt = cls._row_statements.get((columns, use_primary))
+        if stmt is None:
+            stmt = select(users).where(*(users.c[c] == bindparam(c) for c in columns)).limit(1)
+            if use_primary:
+                stmt = stmt.execution_options(use_primary=True)
+            cls._row_statements[(columns, use_primary)] = stmt
+        return stmt
 
+    @traced("repository")
+    def get(self, **kwargs) -> Optional[User]:
+        """Return the matching ORM instance, for callers that go on to modify it."""
+        stmt = self._entity_statement(self._columns(kwargs))
+        return self.db.execute(stmt, kwargs).scalar()
+
+    @traced("repository")
+    def get_row(self, **kwargs) -> Optional[Row]:
+        """Return the matching user as a plain row, for read-only paths."""
+        stmt = self._row_statement(self._columns(kwargs))
+        return self.db.execute(stmt, kwargs).first()
+
+    @traced("repository")
+    def get_primary_row(self, **kwargs) -> Optional[Row]:
+        """Return the matching user as a plain row read from the primary, for checks a write depends on."""
+        stmt = self._row_statement(self._columns(kwargs), use_primary=True)
+        return self.db.execute(stmt, kwargs).first()
+
+    @traced("repository")
+    def search(
+        self,
+        fragment: str,
+        limit: int,
+        after: Optional[Tuple[float, UUID]] = None,
+    ) -> List[Row]:
+        """Return users whose email has a word similar to the fragment, best match first.
+
+        Matching and ranking both use pg_trgm's word_similarity: a row matches when
+        it reaches pg_trgm.word_similarity_threshold (``<%``, served by the GIN
+        trigram index), so the result set only depends on the emails themselves.
+        Rows carry a ``score`` column; pass the last row's ``(score, id)`` as
+        ``after`` to fetch the next page. Every match is scored on each page, so
+        fragments shared by much of the table (a mail domain) cost more than
+        selective ones.
+        """
+        # word_similarity() is float4; compare in float8 so the score round-trips exactly through the cursor
+        score = cast(func.word_similarity(fragment, users.c.email), Float(53))
+        stmt = (
+            select(users, score.label("score"))
+            .where(literal(fragment).op("<%")(users.c.email))
+            .order_by(score.desc(), users.c.id)
+            .limit(limit)
+        )
+        if after is not None:
+            last_score, last_id = after
+            stmt = stmt.where(or_(score < last_score, and_(score == last_score, users.c.id > last_id)))
+        return list(self.db.execute(stmt))
+
+    @traced("repository")
+    def list(self, limit: int, after: Optional[str] = None) -> List[Row]:
+        """Return users ordered by email; pass the last row's email as ``after`` to continue."""
+        stmt = select(users).order_by(users.c.email).limit(limit)
+        if after is not None:
+            stmt = stmt.where(users.c.email > after)
+        return list(self.db.execute(stmt))
+
+    @traced("repository")
     def create(self, email: str, password: str, is_superuser: bool = False):
         user = User(
             email=email,
@@ -21,22 +116,35 @@ class UserRepo:
             is_superuser=is_superuser
         )
         self.db.add(user)
-        self.db.commit()
+        # Refresh before committing so the connection is released by the commit
+        self.db.flush()
         self.db.refresh(user)
+        self.db.commit()
         return user
 
+    @traced("repository")
     def update(self, user_id: UUID, **kwargs):
-        user = self.db.query(User).filter(User.id == user_id).first()
+        user = self.get(id=user_id)
         if not user:
             raise NotFoundError("User", str(user_id))
         for attr, value in kwargs.items():
             setattr(user, attr, value)
-        self.db.commit()
+        self.db.flush()
         self.db.refresh(user)
+        self.db.commit()
         return user
 
+    @traced("repository")
+    def update_columns(self, user_id: UUID, **kwargs) -> None:
+        """Update columns with a single UPDATE statement, without loading the user."""
+        result = self.db.execute(update(users).where(users.c.id == user_id).values(**kwargs))
+        if result.rowcount == 0:
+            raise NotFoundError("User", str(user_id))
+        self.db.commit()
+
+    @traced("repository")
     def delete(self, user_id: UUID) -> None:
-        user = self.db.query(User).filter(User.id == user_id).first()
+        user = self.get(id=user_id)
         if not user:
             raise NotFoundError("User", str(user_id))
         self.db.delete(user)
@@ -1,7 +1,7 @@
 from fastapi import APIRouter
 
 # Public controllers
-from app.controllers.auth.auth_controller import auth_router
+from app.controllers.auth.auth import auth_router
 
 public_router = APIRouter(prefix="/api")
 
@@ -1,8 +1,14 @@
+import base64
+import json
 from fastapi import HTTPException
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session
+from typing import List, Optional, Tuple
 from uuid import UUID
+from datetime import datetime, timezone
 
 from app.core.auth import Auth
+from app.core.tracing import traced
 
 from app.exceptions.database import ConflictError, NotFoundError
 from app.repositories.user import UserRepo
@@ -15,10 +21,11 @@ class AuthService:
     def __init__(self):
         self.auth = Auth()
         
+    @traced("service")
     def refresh_access_token(self, db: Session, user_id: UUID) -> RefreshResponse:
         """Create a new access token using a refresh token."""
         user_repo = UserRepo(db)
-        user = user_repo.get(id=user_id)
+        user = user_repo.get_row(id=user_id)
         if not user:
             raise NotFoundError("User", str(user_id))
         access_token = self.auth.create_access_token(user_id)
@@ -28,14 +35,11 @@ class AuthService:
             expires_in=self.auth.ACCESS_TOKEN_EXPIRE_MINUTES
         )
         
-    def create_tokens(self, db: Session, user_id: UUID) -> LoginResponse:
-        """Create both access and refresh tokens for the user."""
-        user_repo = UserRepo(db)
-        user = user_repo.get(id=user_id)
-        if not user:
-            raise NotFoundError("User", str(user_id))
-        access_token = self.auth.create_access_token(user_id)
-        refresh_token = self.auth.create_refresh_token(user_id)
+    @traced("service")
+    def create_tokens(self, user: Row) -> LoginResponse:
+        """Create both access and refresh tokens for an authenticated user."""
+        access_token = self.auth.create_access_token(user.id)
+        refresh_token = self.auth.create_refresh_token(user.id)
         return LoginResponse(
             access_token=access_token,
             refresh_token=refresh_token,
@@ -44,23 +48,55 @@ class AuthService:
             is_superuser=user.is_superuser
         )
 
+    @traced("service")
     def authenticate_user(self, db: Session, email: str, password: str):
-        """Authenticate user by email and password. Returns user or None."""
+        """Authenticate user by email and password. Returns user row or None."""
         user_repo = UserRepo(db)
-        user = user_repo.get(email=email)
+        user = user_repo.get_row(email=email)
         if not user or not self.auth.verify_password(password, user.password):
             return None
         return user
 
+    @traced("service")
+    def update_last_connected(self, db: Session, user_id: UUID) -> None:
+        """Record the user's last successful login."""
+        UserRepo(db).update_columns(user_id, last_connected_at=datetime.now(timezone.utc))
+
+    @traced("service")
     def create_user(self, db: Session, user_data: UserCreate):
         """Create a new user (only superusers can do this)."""
         user_repo = UserRepo(db)
-        existing_user = user_repo.get(email=user_data.email)
+        existing_user = user_repo.get_primary_row(email=user_data.email)
         if existing_user:
             raise ConflictError("Email", "already registered")
         hashed_password = self.auth.get_password_hash(user_data.password)
         return user_repo.create(user_data.email, hashed_password, user_data.is_superuser)
 
+    @traced("service")
+    def list_users(
+        self, db: Session, query: Optional[str], limit: int, cursor: Optional[str]
+    ) -> Tuple[List[Row], Optional[str]]:
+        """List users, optionally filtered by an email fragment. Returns the page and the next cursor."""
+        user_repo = UserRepo(db)
+        after = _decode_cursor(cursor) if cursor else None
+        if after is not None:
+            try:
+                after = (float(after[0]), UUID(str(after[1]))) if query else str(after[0])
+            except (IndexError, TypeError, ValueError):
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+        # Fetch one extra row to know whether another page exists
+        if query:
+            rows = user_repo.search(query, limit + 1, after)
+        else:
+            rows = user_repo.list(limit + 1, after)
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = _encode_cursor([last.score, str(last.id)] if query else [last.email])
+        return rows, next_cursor
+
+    @traced("service")
     def delete_user(self, db: Session, user_id: UUID, admin_user_id: UUID):
         """Delete a user (only superusers can do this)."""
         if user_id == admin_user_id:
@@ -68,10 +104,11 @@ class AuthService:
         user_repo = UserRepo(db)
         user_repo.delete(user_id)  # Raises NotFoundError if user doesn't exist
 
+    @traced("service")
     def update_password(self, db: Session, user_id: UUID, current_password: str, new_password: str):
         """Update user's password after verifying current password."""
         user_repo = UserRepo(db)
-        user = user_repo.get(id=user_id)
+        user = user_repo.get_primary_row(id=user_id)
         if not user:
             raise NotFoundError("User", str(user_id))
         if not self.auth.verify_password(current_password, user.password):
@@ -79,4 +116,18 @@ class AuthService:
         if self.auth.verify_password(new_password, user.password):
             raise HTTPException(status_code=400, detail="New password must be different from current password")
         new_hashed_password = self.auth.get_password_hash(new_password)
-        return user_repo.update(user_id, password=new_hashed_password)
\ No newline at end of file
+        return user_repo.update(user_id, password=new_hashed_password)
+
+
+def _encode_cursor(values: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or not values:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
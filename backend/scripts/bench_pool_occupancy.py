@@ -0,0 +1,151 @@
+"""Pool occupancy under concurrent load: eager per-request sessions vs LazySession.
+
+Each simulated request either never touches the database (like a token-only
+check) or reaches a user and then spends a few milliseconds building the
+response. In the "write" workload the user is updated; in the "read" workload
+it is only read, like /refresh, which then releases its connection. "eager"
+reproduces the previous get_db (a Session per request, expire_on_commit,
+refresh after commit, reads left in an open transaction); "lazy" is the
+current get_db and service code.
+
+    python scripts/bench_pool_occupancy.py [requests] [concurrency]
+"""
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+_db_file = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ["DB_URL"] = f"sqlite:///{_db_file}"
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("ALGORITHM", "HS256")
+
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import LazySession, RoutingSession, SessionLocal, engine
+from app.models.user import User
+from app.repositories.user import UserRepo
+from app.services.auth.auth import AuthService
+
+NO_DB_SHARE = 0.4
+RESPONSE_WORK_SECONDS = 0.02
+
+EagerSession = sessionmaker(class_=RoutingSession, autoflush=False, bind=engine)
+auth_service = AuthService()
+
+
+def eager_request(user_id):
+    db = EagerSession()
+    try:
+        if user_id is None:
+            time.sleep(RESPONSE_WORK_SECONDS)
+            return
+        user = db.get(User, user_id)
+        user.last_connected_at = datetime.now(timezone.utc)
+        db.commit()
+        db.refresh(user)
+        time.sleep(RESPONSE_WORK_SECONDS)
+        user.email
+    finally:
+        db.close()
+
+
+def lazy_request(user_id):
+    db = LazySession(SessionLocal)
+    try:
+        if user_id is None:
+            time.sleep(RESPONSE_WORK_SECONDS)
+            return
+        user = UserRepo(db).update(user_id, last_connected_at=datetime.now(timezone.utc))
+        time.sleep(RESPONSE_WORK_SECONDS)
+        user.email
+    finally:
+        db.close()
+
+
+def eager_read_request(user_id):
+    db = EagerSession()
+    try:
+        if user_id is None:
+            time.sleep(RESPONSE_WORK_SECONDS)
+            return
+        db.get(User, user_id)
+        time.sleep(RESPONSE_WORK_SECONDS)
+    finally:
+        db.close()
+
+
+def lazy_read_request(user_id):
+    db = LazySession(SessionLocal)
+    try:
+        if user_id is None:
+            time.sleep(RESPONSE_WORK_SECONDS)
+            return
+        auth_service.refresh_access_token(db, user_id)
+        db.release()
+        time.sleep(RESPONSE_WORK_SECONDS)
+    finally:
+        db.close()
+
+
+def run(handler, workload, concurrency):
+    samples = []
+    done = threading.Event()
+
+    def sample():
+        while not done.is_set():
+            samples.append(engine.pool.checkedout())
+            time.sleep(0.001)
+
+    sampler = threading.Thread(target=sample)
+    sampler.start()
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(handler, workload))
+    finally:
+        elapsed = time.perf_counter() - started
+        done.set()
+        sampler.join()
+    return sum(samples) / len(samples), max(samples), elapsed
+
+
+def main(requests: int, concurrency: int) -> None:
+    with engine.begin() as conn:
+        # postgresql.UUID has no SQLite DDL, so the table is declared by hand
+        conn.execute(text(
+            "CREATE TABLE users (id CHAR(32) PRIMARY KEY, email VARCHAR UNIQUE NOT NULL, "
+            "password VARCHAR NOT NULL, is_superuser BOOLEAN, last_connected_at TIMESTAMP, "
+            "created_at TIMESTAMP, updated_at TIMESTAMP)"
+        ))
+    with SessionLocal() as db:
+        users = [User(email=f"user{i}@example.com", password="x") for i in range(requests)]
+        db.add_all(users)
+        db.commit()
+        user_ids = [user.id for user in users]
+
+    rng = random.Random(42)
+    workload = [None if rng.random() < NO_DB_SHARE else user_id for user_id in user_ids]
+    print(f"{requests} requests, {concurrency} concurrent, pool size {engine.pool.size()}")
+    handlers = (
+        ("write", "eager", eager_request),
+        ("write", "lazy", lazy_request),
+        ("read", "eager", eager_read_request),
+        ("read", "lazy", lazy_read_request),
+    )
+    for kind, name, handler in handlers:
+        average, peak, elapsed = run(handler, workload, concurrency)
+        print(f"{kind:<5} {name:<6} checked out avg {average:5.2f}  peak {peak:3d}  wall {elapsed:6.2f}s")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 500,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 8,
+    )
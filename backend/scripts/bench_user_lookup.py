@@ -0,0 +1,67 @@
+"""Micro-benchmark for UserRepo lookups.
+
+Compares the previous Query-per-call lookup with the cached statements used by
+UserRepo.get / UserRepo.get_row, against an in-memory SQLite database so the
+numbers reflect Python-side overhead rather than network round trips.
+
+    python scripts/bench_user_lookup.py [iterations]
+"""
+import os
+import sys
+import timeit
+import uuid
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.models.user import User
+from app.repositories.user import UserRepo
+
+USERS = 1000
+
+
+def legacy_get(db: Session, **kwargs):
+    query = db.query(User)
+    for attr, value in kwargs.items():
+        query = query.filter(getattr(User, attr) == value)
+    return query.first()
+
+
+def main(iterations: int) -> None:
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    with engine.begin() as conn:
+        # postgresql.UUID has no SQLite DDL, so the table is declared by hand
+        conn.execute(text(
+            "CREATE TABLE users (id CHAR(32) PRIMARY KEY, email VARCHAR UNIQUE NOT NULL, "
+            "password VARCHAR NOT NULL, is_superuser BOOLEAN, last_connected_at TIMESTAMP, "
+            "created_at TIMESTAMP, updated_at TIMESTAMP)"
+        ))
+    with Session(engine) as db:
+        db.add_all(User(email=f"user{i}@example.com", password="x" * 60) for i in range(USERS))
+        db.commit()
+
+    emails = [f"user{i}@example.com" for i in range(USERS)]
+    with Session(engine) as db:
+        ids = [uuid.UUID(hex=row[0]) for row in db.execute(text("SELECT id FROM users"))]
+        repo = UserRepo(db)
+        cases = {
+            "legacy Query (email)": lambda i: legacy_get(db, email=emails[i % USERS]),
+            "UserRepo.get (email)": lambda i: repo.get(email=emails[i % USERS]),
+            "UserRepo.get_row (email)": lambda i: repo.get_row(email=emails[i % USERS]),
+            "legacy Query (id)": lambda i: legacy_get(db, id=ids[i % USERS]),
+            "UserRepo.get (id)": lambda i: repo.get(id=ids[i % USERS]),
+            "UserRepo.get_row (id)": lambda i: repo.get_row(id=ids[i % USERS]),
+        }
+        for name, lookup in cases.items():
+            counter = iter(range(10 ** 9))
+            # Identity map would turn repeated ORM lookups into cache hits
+            db.expunge_all()
+            seconds = timeit.timeit(lambda: (lookup(next(counter)), db.expunge_all()), number=iterations)
+            print(f"{name:<28} {seconds / iterations * 1e6:8.1f} us/lookup")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
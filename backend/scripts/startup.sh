@@ -1,7 +1,10 @@
 #!/bin/bash
 set -e
 
-alembic upgrade head
+# Set RUN_MIGRATIONS=false when migrations are applied out of band (e.g. long online migrations)
+if [ "${RUN_MIGRATIONS:-true}" = "true" ]; then
+    alembic upgrade head
+fi
 
 exec gunicorn app.main:app \
     --workers 2 \
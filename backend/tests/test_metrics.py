@@ -0,0 +1,25 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import app.main as main
+
+
+@pytest.fixture
+def client():
+    # No lifespan: the warmup would try to reach the database
+    return TestClient(main.app)
+
+
+def test_metrics_disabled_without_token(client, monkeypatch):
+    monkeypatch.setattr(main, "METRICS_TOKEN", "")
+    assert client.get("/metrics").status_code == 404
+
+
+def test_metrics_require_token(client, monkeypatch):
+    monkeypatch.setattr(main, "METRICS_TOKEN", "scrape-me")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+
+    response = client.get("/metrics", headers={"Authorization": "Bearer scrape-me"})
+    assert response.status_code == 200
+    assert set(response.json()) == {"counters", "gauges"}
@@ -0,0 +1,77 @@
+from app.core.migrations import format_lock_report, lock_report
+
+# Shaped like `alembic upgrade <start>:head --sql` output with transaction_per_migration
+OFFLINE_SQL = """
+BEGIN;
+
+-- Running upgrade a9c4c0f8cb88 -> 3f1d7c2b9e41
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+COMMIT;
+
+SET lock_timeout = 0;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_email_trgm ON users USING gin (email gin_trgm_ops);
+
+RESET lock_timeout;
+
+BEGIN;
+
+UPDATE alembic_version SET version_num='3f1d7c2b9e41' WHERE alembic_version.version_num = 'a9c4c0f8cb88';
+
+COMMIT;
+
+BEGIN;
+
+ALTER TABLE "orders" ADD CONSTRAINT "fk_orders_user" FOREIGN KEY ("user_id") REFERENCES "users" ("id") NOT VALID;
+
+ALTER TABLE "users" ADD CONSTRAINT "ck_users_email" CHECK (email <> '') NOT VALID;
+
+CREATE INDEX ix_orders_created_at ON orders (created_at);
+
+COMMIT;
+
+SET lock_timeout = 0;
+
+ALTER TABLE "orders" VALIDATE CONSTRAINT "fk_orders_user";
+
+RESET lock_timeout;
+"""
+
+
+def test_lock_report_classifies_statements_and_tracks_transactions():
+    report = lock_report(OFFLINE_SQL)
+
+    assert [(entry["table"], entry["lock"], entry["transaction"]) for entry in report] == [
+        ("-", "-", "held until COMMIT"),
+        ("users", "SHARE UPDATE EXCLUSIVE", "autocommit"),
+        ("orders", "SHARE ROW EXCLUSIVE", "held until COMMIT"),
+        ("users", "ACCESS EXCLUSIVE", "held until COMMIT"),
+        ("orders", "SHARE", "held until COMMIT"),
+        ("orders", "SHARE UPDATE EXCLUSIVE", "autocommit"),
+    ]
+    assert report[1]["statement"].startswith("CREATE INDEX CONCURRENTLY")
+    assert report[3]["impact"] == "blocks reads and writes (brief, no scan)"
+    assert report[4]["impact"] == "blocks writes for the whole index build"
+
+
+def test_lock_report_skips_version_bookkeeping_and_session_settings():
+    statements = " ".join(entry["statement"] for entry in lock_report(OFFLINE_SQL))
+    assert "alembic_version" not in statements
+    assert "lock_timeout" not in statements
+
+
+def test_lock_report_shortens_long_statements():
+    sql = "CREATE TABLE users (" + ", ".join(f"column_{i} VARCHAR" for i in range(20)) + ");"
+    (entry,) = lock_report(sql)
+    assert len(entry["statement"]) == 100
+    assert entry["statement"].endswith("...")
+
+
+def test_format_lock_report():
+    text = format_lock_report(lock_report("DROP INDEX ix_users_email;"))
+    assert "[ACCESS EXCLUSIVE] - - blocks reads and writes (brief) (autocommit)" in text
+    assert "DROP INDEX ix_users_email" in text
+
+    assert format_lock_report([]).endswith("No statements to run between the starting revision and the target.")
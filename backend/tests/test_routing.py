@@ -0,0 +1,160 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, delete, select, text, update
+
+import app.core.database as database
+from app.core.routing import (
+    STICKY_COOKIE,
+    STICKY_HEADER,
+    PrimaryStickinessMiddleware,
+    ReplicaSelector,
+    _sticky_until,
+    mark_write,
+    primary_pinned,
+)
+from app.models.user import User
+
+users = User.__table__
+
+
+@pytest.fixture
+def replicas(monkeypatch, tmp_path):
+    """Primary plus two replicas (SQLite files); replica 0 cannot be connected to."""
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    dead = create_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    alive = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    engines = [dead, alive]
+    for replica in engines:
+        database._watch_replica(replica)
+    selector = ReplicaSelector(engines)
+    monkeypatch.setattr(database, "engine", primary)
+    monkeypatch.setattr(database, "replica_engines", engines)
+    monkeypatch.setattr(database, "replica_selector", selector)
+    yield SimpleNamespace(primary=primary, dead=dead, alive=alive, selector=selector)
+    for e in (primary, dead, alive):
+        e.dispose()
+
+
+def _bind_of_next_read(session):
+    session.execute(text("SELECT 1"))
+    return session.info.get("replica", database.engine)
+
+
+def test_dead_replica_falls_back_to_next_replica(replicas):
+    with database.SessionLocal() as session:
+        assert _bind_of_next_read(session) is replicas.alive
+    assert replicas.selector.pick() is replicas.alive  # the dead one is out of rotation
+
+
+def test_all_replicas_dead_falls_back_to_primary(replicas, monkeypatch):
+    monkeypatch.setattr(database, "replica_engines", [replicas.dead])
+    monkeypatch.setattr(database, "replica_selector", ReplicaSelector([replicas.dead]))
+    with database.SessionLocal() as session:
+        assert _bind_of_next_read(session) is replicas.primary
+
+
+def test_replica_is_chosen_again_for_each_transaction(replicas):
+    with database.SessionLocal() as session:
+        _bind_of_next_read(session)
+        session.commit()
+        assert "replica" not in session.info
+
+
+def test_failed_pre_ping_keeps_replica_in_rotation(replicas):
+    context = SimpleNamespace(is_pre_ping=True, is_disconnect=True, connection=None)
+    replicas.alive.dialect.dispatch.handle_error(context)
+    assert replicas.selector.pick() is replicas.dead
+    assert replicas.selector.pick() is replicas.alive
+
+    replicas.alive.dialect.dispatch.handle_error(SimpleNamespace(is_pre_ping=False, is_disconnect=True, connection=None))
+    assert replicas.selector.pick() is replicas.dead
+    assert replicas.selector.pick() is replicas.dead
+
+
+@pytest.mark.parametrize("headers, expected", [
+    ([], 0.0),
+    ([(STICKY_HEADER.encode(), b"1700000000")], 1700000000.0),
+    ([(b"X-DB-Primary-Until", b"1700000000.5")], 1700000000.5),
+    ([(b"cookie", f"theme=dark; {STICKY_COOKIE}=1700000000".encode())], 1700000000.0),
+    ([(b"cookie", b"theme=dark")], 0.0),
+    ([(STICKY_HEADER.encode(), b"soon"), (b"cookie", f"{STICKY_COOKIE}=1700000000".encode())], 1700000000.0),
+    ([(STICKY_HEADER.encode(), b"soon")], 0.0),
+])
+def test_sticky_until_reads_header_and_cookie(headers, expected):
+    assert _sticky_until(headers) == expected
+
+
+def _run_middleware(headers, write=False, sticky_seconds=5):
+    seen = {}
+
+    async def app(scope, receive, send):
+        seen["pinned"] = primary_pinned()
+        if write:
+            mark_write()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    middleware = PrimaryStickinessMiddleware(app, sticky_seconds=sticky_seconds)
+    asyncio.run(middleware({"type": "http", "headers": headers}, None, send))
+    return seen["pinned"], dict(sent[0]["headers"])
+
+
+@pytest.mark.parametrize("offset, pinned", [(3, True), (5, True), (-1, False), (60, False), (1e9, False)])
+def test_sticky_deadline_must_fall_within_one_window(offset, pinned):
+    until = str(time.time() + offset).encode()
+    assert _run_middleware([(STICKY_HEADER.encode(), until)])[0] is pinned
+
+
+@pytest.mark.parametrize("value", [b"inf", b"nan", b"-inf"])
+def test_sticky_deadline_rejects_non_finite_values(value):
+    assert _run_middleware([(STICKY_HEADER.encode(), value)])[0] is False
+
+
+def test_write_sets_sticky_header_and_cookie():
+    pinned, headers = _run_middleware([], write=True, sticky_seconds=5)
+    until = int(headers[STICKY_HEADER.encode()])
+    assert not pinned
+    assert 0 < until - time.time() <= 5
+    assert headers[b"set-cookie"].decode().startswith(f"{STICKY_COOKIE}={until}; Max-Age=5")
+
+    assert _run_middleware([], write=False)[1] == {}
+
+
+def test_selector_round_robins_and_skips_failed_replicas(monkeypatch):
+    a, b, c = object(), object(), object()
+    selector = ReplicaSelector([a, b, c], retry_seconds=30)
+    assert [selector.pick() for _ in range(4)] == [a, b, c, a]
+
+    selector.mark_failed(b)
+    assert [selector.pick() for _ in range(4)] == [c, a, c, a]
+
+    selector.mark_failed(a)
+    selector.mark_failed(c)
+    assert selector.pick() is None
+
+    # Back in rotation once the retry window has passed
+    later = time.monotonic() + 31
+    monkeypatch.setattr(time, "monotonic", lambda: later)
+    assert {selector.pick() for _ in range(3)} == {a, b, c}
+
+
+@pytest.mark.parametrize("statement, is_write", [
+    (text("SELECT 1"), False),
+    (text("  with t as (select 1) select * from t"), False),
+    (text("UPDATE users SET email = 'x'"), True),
+    (text("SET lock_timeout = '1s'"), True),
+    (select(users), False),
+    (select(users).with_for_update(), True),
+    (update(users).values(email="x"), True),
+    (delete(users), True),
+    (users.insert().values(email="x"), True),
+])
+def test_is_write(statement, is_write):
+    assert database._is_write(statement) is is_write
@@ -0,0 +1,109 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import tracing
+from app.core.tracing import Tracer, TracingMiddleware, current_span, parse_traceparent
+
+TRACE_ID = "0af7651916cd43dd8448eb211c80319c"
+PARENT_ID = "b7ad6b7169203331"
+
+
+class ListExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+
+@pytest.mark.parametrize("header, sampled", [
+    (f"00-{TRACE_ID}-{PARENT_ID}-01", True),
+    (f"00-{TRACE_ID}-{PARENT_ID}-00", False),
+    (f"00-{TRACE_ID.upper()}-{PARENT_ID}-03", True),
+    (f"  00-{TRACE_ID}-{PARENT_ID}-01  ", True),
+])
+def test_parse_traceparent(header, sampled):
+    span = parse_traceparent(header)
+    assert (span.trace_id, span.span_id, span.sampled) == (TRACE_ID, PARENT_ID, sampled)
+
+
+@pytest.mark.parametrize("header", [
+    None,
+    "",
+    "garbage",
+    f"01-{TRACE_ID}-{PARENT_ID}-01",
+    f"00-{TRACE_ID[:-1]}-{PARENT_ID}-01",
+    f"00-{TRACE_ID}-{PARENT_ID}",
+    f"00-{'0' * 32}-{PARENT_ID}-01",
+    f"00-{TRACE_ID}-{'0' * 16}-01",
+])
+def test_parse_traceparent_rejects_invalid(header):
+    assert parse_traceparent(header) is None
+
+
+@pytest.mark.parametrize("ratio", [0.0, 1.0])
+def test_children_inherit_the_root_sampling_decision(ratio):
+    exporter = ListExporter()
+    tracer = Tracer(exporter, sample_ratio=ratio)
+    root = tracer.start_span("root")
+    child = tracer.start_span("child")
+    assert current_span() is child
+    tracer.end_span(child)
+    assert current_span() is root
+    tracer.end_span(root)
+    assert current_span() is None
+
+    assert root.sampled is child.sampled is (ratio == 1.0)
+    assert child.trace_id == root.trace_id and child.parent_id == root.span_id
+    assert exporter.spans == ([child, root] if ratio else [])
+
+
+@pytest.mark.parametrize("flags, exported", [("01", True), ("00", False)])
+def test_remote_parent_decision_overrides_local_ratio(flags, exported):
+    exporter = ListExporter()
+    tracer = Tracer(exporter, sample_ratio=1.0 - exported)
+    span = tracer.start_span("server", parent=parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-{flags}"))
+    tracer.end_span(span, ValueError("boom"))
+
+    assert (span.trace_id, span.parent_id) == (TRACE_ID, PARENT_ID)
+    assert bool(exporter.spans) is exported
+    assert span.to_otlp()["status"] == {"code": "ERROR", "message": "ValueError"}
+
+
+@pytest.fixture
+def exported(monkeypatch):
+    exporter = ListExporter()
+    monkeypatch.setattr(tracing.tracer, "exporter", exporter)
+    monkeypatch.setattr(tracing.tracer, "sample_ratio", 1.0)
+    app = FastAPI()
+    app.add_middleware(TracingMiddleware)
+
+    @app.get("/v1/items/{item_id}")
+    async def read_item(item_id: int):
+        return {"item_id": item_id}
+
+    return TestClient(app), exporter.spans
+
+
+def test_response_traceparent_continues_incoming_trace(exported):
+    client, spans = exported
+    response = client.get("/v1/items/7", headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"})
+
+    returned = parse_traceparent(response.headers["traceparent"])
+    (server,) = spans
+    assert returned.trace_id == TRACE_ID
+    assert returned.span_id == server.span_id != PARENT_ID
+    assert server.parent_id == PARENT_ID
+
+
+def test_server_span_is_named_after_the_route_template(exported):
+    client, spans = exported
+    # The id also appears elsewhere in the path; only the parameter must be templated
+    client.get("/v1/items/1")
+    client.get("/missing")
+
+    assert [span.name for span in spans] == ["GET /v1/items/{item_id}", "HTTP GET"]
+    assert spans[0].attributes["http.route"] == "/v1/items/{item_id}"
+    assert spans[0].attributes["http.status_code"] == 200
+    assert spans[1].attributes["http.status_code"] == 404
@@ -0,0 +1,74 @@
+import base64
+import json
+import os
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.core.database import Base
+from app.models.user import User
+from app.services.auth.auth import AuthService
+
+# Search relies on pg_trgm; point TEST_DB_URL at a Postgres database where the extension is available
+TEST_DB_URL = os.getenv("TEST_DB_URL")
+
+
+@pytest.fixture
+def db():
+    if not TEST_DB_URL:
+        pytest.skip("TEST_DB_URL is not set")
+    engine = create_engine(TEST_DB_URL)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+def _search_all(db, query, page_size):
+    service = AuthService()
+    seen, cursor = [], None
+    while True:
+        rows, cursor = service.list_users(db, query, page_size, cursor)
+        seen.extend(rows)
+        if cursor is None:
+            return seen
+
+
+def test_search_pages_through_tied_scores(db):
+    # Same shape, so every email gets the same score for "tie"
+    emails = [f"tie{i:03d}@example.io" for i in range(25)]
+    db.add_all(User(id=uuid.uuid4(), email=email, password="x") for email in emails)
+    db.add(User(id=uuid.uuid4(), email="nomatch@example.io", password="x"))
+    db.commit()
+
+    seen = _search_all(db, "tie", 4)
+
+    assert len({row.score for row in seen}) == 1
+    assert sorted(row.email for row in seen) == emails
+    assert [row.id for row in seen] == sorted(row.id for row in seen)
+
+
+def test_search_ranks_closest_word_first(db):
+    emails = ["tiger@example.io", "tie@example.io", "tie123@example.io", "other@example.io"]
+    db.add_all(User(id=uuid.uuid4(), email=email, password="x") for email in emails)
+    db.commit()
+
+    seen = _search_all(db, "tie", 2)
+
+    assert [row.email for row in seen][:2] == ["tie@example.io", "tie123@example.io"]
+    assert "other@example.io" not in {row.email for row in seen}
+    assert [row.score for row in seen] == sorted((row.score for row in seen), reverse=True)
+
+
+@pytest.mark.parametrize("values", [[0.5, 5], [0.5], ["high", str(uuid.uuid4())], [0.5, "not-a-uuid"]])
+def test_search_rejects_malformed_cursor(values):
+    cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+    with pytest.raises(HTTPException) as exc:
+        AuthService().list_users(Session(), "adm", 10, cursor)
+    assert exc.value.status_code == 400
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool
+
+from app.core import warmup
+
+
+@pytest.fixture
+def flaky_engine(tmp_path):
+    """Pooled SQLite engine whose second connection attempt fails."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'warm.db'}", poolclass=QueuePool, pool_size=5)
+    attempts = {"count": 0}
+
+    @event.listens_for(engine, "do_connect")
+    def _connect(dialect, conn_rec, cargs, cparams):
+        attempts["count"] += 1
+        if attempts["count"] == 2:
+            raise OSError("connection refused")
+
+    yield engine
+    engine.dispose()
+
+
+def test_warm_pool_closes_opened_connections_when_a_connect_fails(flaky_engine, monkeypatch):
+    # Keep a reference to every connection, so one left open is not quietly reclaimed by GC
+    opened = []
+    connect = flaky_engine.connect
+    monkeypatch.setattr(flaky_engine, "connect", lambda: opened.append(connect()) or opened[-1])
+
+    with pytest.raises(Exception):
+        warmup.warm_pool(flaky_engine, 3)
+    assert len(opened) == 1
+    assert opened[0].closed
+    assert flaky_engine.pool.checkedout() == 0
+
+
+def test_warm_pool_leaves_connections_in_the_pool(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'warm.db'}", poolclass=QueuePool, pool_size=5)
+    warmup.warm_pool(engine, 3)
+    assert (engine.pool.checkedin(), engine.pool.checkedout()) == (3, 0)
+    engine.dispose()
+
+
+def test_run_warmup_gates_on_primary_only_and_keeps_finished_steps(monkeypatch):
+    primary, replica = object(), object()
+    calls = []
+
+    def warm_pool(engine, connections):
+        calls.append("replica" if engine is replica else "primary")
+        if engine is replica:
+            raise OSError("replica down")
+
+    hashing_attempts = []
+
+    def warm_hashing():
+        hashing_attempts.append(1)
+        if len(hashing_attempts) == 1:
+            raise RuntimeError("bcrypt backend not ready")
+
+    async def no_sleep(_):
+        pass
+
+    monkeypatch.setattr(warmup, "warm_pool", warm_pool)
+    monkeypatch.setattr(warmup, "warm_hashing", warm_hashing)
+    monkeypatch.setattr(warmup, "warm_schemas", lambda app: None)
+    monkeypatch.setattr(warmup.asyncio, "sleep", no_sleep)
+
+    app = FastAPI()
+    app.state.ready = False
+    asyncio.run(warmup.run_warmup(app, primary, [replica], 2))
+
+    assert app.state.ready is True
+    assert len(hashing_attempts) == 2
+    # The primary pool was warmed once despite the hashing retry; the dead replica did not block readiness
+    assert calls == ["primary", "replica"]